@@ -0,0 +1,218 @@
+from .constants import LANE_HERO_SLOTS
+from .nodes import (
+    LaneRunnerBase, VirusRunner, OilRunner, MiniSoapRunner,
+    LiquidSoapRunner, AntivirusRunner,
+)
+
+
+class Autopilot:
+    # one tap moves the soap a lane in 150 ms, the next tap comes a frame later
+    LANE_MOVE_DURATION = 167.
+    # the frozen timer is not exposed, assume it has just started
+    FROZEN_DURATION = 800.
+    # runners are catchable from when they touch the soap's hitbox
+    # (330 * 0.7 tall, centered on the lane) until they touch the border
+    CATCH_START_Y = LANE_HERO_SLOTS[0].y - 330 * 0.7 / 2 - 48.
+    CATCH_END_Y = 350. - 48.
+    # reach a runner this long before it leaves the catch window
+    CATCH_MARGIN = 25.
+    # while moving, the soap overlaps the lane it heads to after this long,
+    # and the lane it left until this long
+    LANE_ENTER_DURATION = 26.
+    LANE_LEAVE_DURATION = 124.
+    # runners arriving later than this do not affect the decision yet
+    HORIZON = 3000.
+    # a caught virus gives one person, a missed one costs 50
+    VIRUS_VALUE = 51.
+    OIL_PENALTY = 60.
+    # chains kept per runner, see _plan()
+    CHAINS_PER_TARGET = 4
+    # use a powerup when a virus the plan cannot catch is this close to
+    # the border
+    ANTIVIRUS_DEADLINE = 120.
+    LIQUID_SOAP_DEADLINE = 600.
+
+    def __init__(self, *, player_manager, powerups_manager, runners_manager,
+                 player_state):
+        self.player_manager = player_manager
+        self.powerups_manager = powerups_manager
+        self.runners_manager = runners_manager
+        self.player_state = player_state
+
+    def update(self):
+        player_manager = self.player_manager
+        current_lane = player_manager.current_lane
+        if player_manager.is_frozen:
+            free_at = self.FROZEN_DURATION
+        elif player_manager.is_moving:
+            distance = abs(
+                player_manager.soap.position.x
+                - LANE_HERO_SLOTS[current_lane].x
+            )
+            free_at = self.LANE_MOVE_DURATION * distance / (
+                LANE_HERO_SLOTS[1].x - LANE_HERO_SLOTS[0].x
+            )
+        else:
+            free_at = 0.
+
+        targets, oils = self._catch_windows()
+        first_lane, chain = self._plan(current_lane, free_at, targets, oils)
+        self._use_powerups(
+            target for target in targets
+            if target not in chain and isinstance(target[4], VirusRunner)
+        )
+
+        if free_at or first_lane == current_lane:
+            return
+        if first_lane < current_lane:
+            player_manager.move_left(True)
+            player_manager.move_left(False)
+        else:
+            player_manager.move_right(True)
+            player_manager.move_right(False)
+
+    def _catch_windows(self):
+        # (lane, opens_at, closes_at, value, runner), in ms from now
+        targets = []
+        oils = []
+        for runner in self.runners_manager.space_node.children:
+            if not isinstance(runner, LaneRunnerBase) or runner.is_destroying:
+                continue
+            position = runner.position
+            velocity = runner.velocity.y
+            if velocity <= 0 or position.y >= self.CATCH_END_Y:
+                continue
+            opens_at = max(self.CATCH_START_Y - position.y, 0.) / velocity * 1000.
+            if opens_at > self.HORIZON:
+                continue
+            closes_at = (self.CATCH_END_Y - position.y) / velocity * 1000.
+            lane = self._lane_of(position.x)
+            if isinstance(runner, OilRunner):
+                oils.append((lane, opens_at, closes_at))
+                continue
+            value = self._runner_value(runner)
+            if value > 0:
+                targets.append((lane, opens_at, closes_at, value, runner))
+        return targets, oils
+
+    def _plan(self, lane, free_at, targets, oils):
+        # Builds chains of catches, taking targets in order of their
+        # deadlines. For each target only a few chains ending with it are
+        # kept, the ones freeing the soap soonest among those worth more
+        # than any chain freeing it sooner.
+        # After its last catch the soap waits in that lane or steps aside,
+        # whichever touches less oil. Returns the lane to head to first and
+        # the targets the best chain catches.
+        # chain ends: (value, leave_at, lane, first lane, caught targets)
+        chain_ends = [(0., free_at, lane, None, ())]
+        for target in sorted(targets, key=lambda target: target[2]):
+            target_lane, opens_at, closes_at, value, _ = target
+            candidates = []
+            for chain_value, leave_at, chain_lane, first_lane, chain in chain_ends:
+                arrive_at = (
+                    leave_at
+                    + abs(target_lane - chain_lane) * self.LANE_MOVE_DURATION
+                )
+                if arrive_at > closes_at - self.CATCH_MARGIN:
+                    continue
+                target_leave_at = max(arrive_at, opens_at + self.CATCH_MARGIN)
+                candidates.append((
+                    chain_value + value - self._oil_penalty(
+                        oils, chain_lane, leave_at, target_lane,
+                        target_leave_at,
+                    ),
+                    target_leave_at, target_lane,
+                    target_lane if first_lane is None else first_lane,
+                    chain + (target,),
+                ))
+            candidates.sort(key=lambda candidate: (candidate[1], -candidate[0]))
+            kept = []
+            for candidate in candidates:
+                if not kept or candidate[0] > kept[-1][0]:
+                    kept.append(candidate)
+            chain_ends.extend(kept[:self.CHAINS_PER_TARGET])
+
+        best = None
+        for chain_value, leave_at, chain_lane, first_lane, chain in chain_ends:
+            for end_lane in range(len(LANE_HERO_SLOTS)):
+                move_to = end_lane if first_lane is None else first_lane
+                value = chain_value - self._oil_penalty(
+                    oils, chain_lane, leave_at, end_lane, self.HORIZON,
+                )
+                # prefer staying put on ties
+                key = (value, -abs(move_to - lane))
+                if best is None or key > best[0]:
+                    best = (key, move_to, chain)
+        return best[1], best[2]
+
+    def _oil_penalty(self, oils, from_lane, leave_at, to_lane, stay_until):
+        # for the oil the soap touches waiting in from_lane, moving from it
+        # at leave_at over to to_lane and waiting there until stay_until
+        lanes_count = abs(to_lane - from_lane)
+        direction = 1 if to_lane >= from_lane else -1
+        penalty = 0.
+        for oil_lane, opens_at, closes_at in oils:
+            lanes_moved = (oil_lane - from_lane) * direction
+            if lanes_moved < 0 or lanes_moved > lanes_count:
+                continue
+            if lanes_moved == 0:
+                touches_from = 0.
+            else:
+                touches_from = (
+                    leave_at + (lanes_moved - 1) * self.LANE_MOVE_DURATION
+                    + self.LANE_ENTER_DURATION
+                )
+            if lanes_moved == lanes_count:
+                touches_until = stay_until
+            else:
+                touches_until = (
+                    leave_at + lanes_moved * self.LANE_MOVE_DURATION
+                    + self.LANE_LEAVE_DURATION
+                )
+            if touches_from < closes_at and touches_until > opens_at:
+                penalty += self.OIL_PENALTY
+        return penalty
+
+    def _runner_value(self, runner):
+        player_state = self.player_state
+        if isinstance(runner, VirusRunner):
+            return self.VIRUS_VALUE
+        elif isinstance(runner, MiniSoapRunner):
+            fuel_level = (
+                int(player_state.soap_meter_counter)
+                / player_state.soap_meter_counter.max_value
+            )
+            # worth more than a virus once the meter runs low
+            return 5. + 120. * max(0.8 - fuel_level, 0.)
+        elif isinstance(runner, LiquidSoapRunner):
+            counter = player_state.liquid_soap_powerup_counter
+            return 6. if counter < counter.max_value else 0.
+        elif isinstance(runner, AntivirusRunner):
+            counter = player_state.antivirus_powerup_counter
+            return 25. if counter < counter.max_value else 0.
+        return 0.
+
+    def _use_powerups(self, missed_viruses):
+        missed_at = min(
+            (target[2] for target in missed_viruses), default=None,
+        )
+        if missed_at is None:
+            return
+        player_state = self.player_state
+        if (
+            missed_at < self.ANTIVIRUS_DEADLINE
+            and player_state.antivirus_powerup_counter > 0
+        ):
+            self.powerups_manager.use_antivirus()
+        elif (
+            missed_at < self.LIQUID_SOAP_DEADLINE
+            and player_state.liquid_soap_powerup_counter > 0
+            and not self.runners_manager.slowdown_power
+        ):
+            self.powerups_manager.use_liquid_soap()
+
+    def _lane_of(self, x: float) -> int:
+        return min(
+            range(len(LANE_HERO_SLOTS)),
+            key=lambda i: abs(LANE_HERO_SLOTS[i].x - x),
+        )
@@ -1,19 +1,16 @@
 import enum
 from pathlib import Path
 
+from kaa.fonts import Font
 from kaa.geometry import Vector
 from kaa.sprites import Sprite, split_spritesheet
 
+from .lanes import LANE_X_POSITIONS, LANE_HERO_Y, LANE_ENEMY_Y
 
-LANE_HERO_SLOTS = [
-    Vector(3 + (109 * i), 220)
-    for i in range(-2, 3)
-]
 
-LANE_ENEMY_SLOTS = [
-    Vector(3 + (109 * i), -500)
-    for i in range(-2, 3)
-]
+LANE_HERO_SLOTS = [Vector(x, LANE_HERO_Y) for x in LANE_X_POSITIONS]
+
+LANE_ENEMY_SLOTS = [Vector(x, LANE_ENEMY_Y) for x in LANE_X_POSITIONS]
 
 
 class CollisionTrigger(enum.IntEnum):
@@ -23,9 +20,39 @@ class CollisionTrigger(enum.IntEnum):
     runner_pickup = enum.auto()
 
 
+# kaa 0.7 stable-sorts nodes for drawing by (z_index, node address), so nodes
+# sharing a z_index are drawn in no defined order. Nodes that overlap within
+# a layer and need a fixed order take a sub-order in it with layer_z().
+LAYER_SPAN = 1000
+
+
+class Layer(enum.IntEnum):
+    background = -1000
+    water_front = 1000
+    runners = 2000
+    player = 3000
+    particles = 4000
+    ui = 5000
+    overlay = 10000
+    game_over = 15000
+    game_over_text = 16000
+
+
+def layer_z(layer: Layer, order: int) -> int:
+    assert 0 <= order < LAYER_SPAN
+    return layer + order
+
+
 ASSETS_DIRECTORY = Path(__file__).parent / 'assets'
 assert ASSETS_DIRECTORY.is_dir()
 
+HIGH_SCORES_DIRECTORY = Path.home() / '.hope_in_soap'
+
+FONT_PIXELED = Font(str(ASSETS_DIRECTORY / 'Pixeled_0.ttf'))
+
+SPRITE_MENU_BACKGROUND = Sprite(str(ASSETS_DIRECTORY / 'home.png'))
+SPRITE_MENU_PAGE = Sprite(str(ASSETS_DIRECTORY / 'page.png'))
+SPRITE_LOGO = Sprite(str(ASSETS_DIRECTORY / 'logo1.png'))
 SPRITE_WATER_BACK = Sprite(str(ASSETS_DIRECTORY / 'bg.png'))
 SPRITE_WATER_FRONT = Sprite(str(ASSETS_DIRECTORY / 'fasterbg.png'))
 SPRITE_HAND = Sprite(str(ASSETS_DIRECTORY / 'hand.png'))
@@ -43,6 +70,8 @@ SPRITE_OIL = Sprite(str(ASSETS_DIRECTORY / 'oil.png'))
 SPRITE_FRAMES_MINI_SOAP = split_spritesheet(
     Sprite(str(ASSETS_DIRECTORY / 'bonus1.png')), Vector(100, 100),
 )
+SPRITE_BUBBLE = Sprite(str(ASSETS_DIRECTORY / 'bubble.png'))
+SPRITE_MONEY = Sprite(str(ASSETS_DIRECTORY / 'money.png'))
 SPRITE_FRAMES_PEOPLE = [
     Sprite(str(ASSETS_DIRECTORY / f'person{i}.png'))
     for i in range(1, 7)
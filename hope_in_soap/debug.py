@@ -0,0 +1,235 @@
+import gc
+import sys
+import collections
+import tracemalloc
+
+from kaa.fonts import TextNode
+
+from .constants import Layer, LAYER_SPAN
+
+
+def _layer_name(z_index):
+    for layer in Layer:
+        if 0 <= z_index - layer < LAYER_SPAN:
+            return layer.name
+    return None
+
+
+def _texture_key(node):
+    if isinstance(node, TextNode):
+        return ('font', id(node.font))
+    if node.sprite is not None:
+        return ('sprite', id(node.sprite))
+    return ('shape', None)
+
+
+def z_layers_report(root_node) -> dict:
+    nodes_per_z = collections.Counter()
+    drawn_nodes = set()
+
+    def _visit(node, parent_z):
+        if not node.visible:
+            return
+        z_index = node.z_index if node.z_index is not None else parent_z
+        if (
+            node.sprite is not None or node.shape is not None
+            or isinstance(node, TextNode)
+        ):
+            nodes_per_z[z_index] += 1
+            drawn_nodes.add((z_index, _texture_key(node)))
+        for child_node in node.children:
+            _visit(child_node, z_index)
+
+    _visit(root_node, 0)
+    nodes_per_layer = collections.Counter()
+    for z_index, count in sorted(nodes_per_z.items()):
+        nodes_per_layer[_layer_name(z_index) or str(z_index)] += count
+    return {
+        'distinct_z': len(nodes_per_z),
+        # kaa 0.7 issues a draw call for every node
+        'draw_calls': sum(nodes_per_z.values()),
+        # nodes of the same z are drawn in address order, so a batching
+        # renderer would need one batch per (z, texture) pair at the least
+        'min_batches': len(drawn_nodes),
+        'unregistered_z': sorted(
+            z for z in nodes_per_z if _layer_name(z) is None
+        ),
+        'nodes_per_layer': dict(nodes_per_layer),
+    }
+
+
+def print_z_layers_report(root_node):
+    report = z_layers_report(root_node)
+    print(
+        "Z layers: {distinct_z} distinct z values, {draw_calls} draw calls, "
+        "at least {min_batches} batches if batched".format(**report)
+    )
+    if report['unregistered_z']:
+        print("  unregistered z values: {}".format(report['unregistered_z']))
+    for name, count in report['nodes_per_layer'].items():
+        print("  {:<12} {:>5} nodes".format(name, count))
+
+
+def print_particles_report(particles_stats: dict):
+    print("Particles (budget 1 ms per frame):")
+    for name, stats in particles_stats.items():
+        print(
+            "  {:<8} {particles:>5} alive, {rendered:>3} rendered, "
+            "update {update_ms:.3f} ms (max {max_update_ms:.3f} ms), "
+            "render {render_ms:.3f} ms, "
+            "{dropped_bursts} dropped bursts".format(name, **stats)
+        )
+
+
+def count_nodes(root_node) -> collections.Counter:
+    counts = collections.Counter()
+    nodes = [root_node]
+    while nodes:
+        node = nodes.pop()
+        counts[type(node).__name__] += 1
+        nodes.extend(node.children)
+    return counts
+
+
+class AllocationTracker:
+    SAMPLE_EVERY_FRAMES = 60
+    TOP_LINES = 15
+    FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ]
+
+    def __init__(self, *, tracked_roots: dict):
+        self.tracked_roots = tracked_roots
+        self.frames_count = 0
+        self.sample_snapshot = None
+        # net growth per frame: [(module:line, bytes, allocations)]
+        self.last_sample = []
+        # every frame: net change of allocated blocks and of gen0 objects
+        self.blocks_diff = 0
+        self.gen0_diff = 0
+        self.sample_blocks_diff = 0
+        self.sample_max_blocks_diff = 0
+        self.sample_gen0_diff = 0
+        self.last_frame_counts = None
+        self._allocated_blocks = 0
+        self._gen0_count = 0
+        self.dump_snapshot = None
+        self.dump_node_counts = None
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def toggle(self):
+        if self.is_tracing:
+            tracemalloc.stop()
+            self.sample_snapshot = self.dump_snapshot = None
+            print("Allocation tracking stopped")
+        else:
+            self._start()
+
+    def node_counts(self) -> dict:
+        return {
+            name: count_nodes(root_node)
+            for name, root_node in self.tracked_roots.items()
+        }
+
+    def update(self):
+        if not self.is_tracing:
+            return
+        self._count_frame()
+        self.frames_count += 1
+        if self.frames_count < self.SAMPLE_EVERY_FRAMES:
+            return
+
+        snapshot = self._take_snapshot()
+        self.last_sample = [
+            (
+                '{}:{}'.format(stat.traceback[0].filename, stat.traceback[0].lineno),
+                stat.size_diff / self.frames_count,
+                stat.count_diff / self.frames_count,
+            )
+            for stat in snapshot.compare_to(self.sample_snapshot, 'lineno')
+            if stat.size_diff > 0
+        ][:self.TOP_LINES]
+        self.last_frame_counts = (
+            self.sample_blocks_diff / self.frames_count,
+            self.sample_max_blocks_diff,
+            self.sample_gen0_diff / self.frames_count,
+        )
+        self.sample_snapshot = snapshot
+        self.frames_count = 0
+        self.sample_blocks_diff = self.sample_max_blocks_diff = 0
+        self.sample_gen0_diff = 0
+        # taking the snapshot allocates as well, don't count it into next frame
+        self._reset_frame_counts()
+
+    def _count_frame(self):
+        allocated_blocks = sys.getallocatedblocks()
+        gen0_count = gc.get_count()[0]
+        self.blocks_diff = allocated_blocks - self._allocated_blocks
+        # gen0 count drops back when a collection happens in between
+        self.gen0_diff = max(gen0_count - self._gen0_count, 0)
+        self._allocated_blocks = allocated_blocks
+        self._gen0_count = gen0_count
+        self.sample_blocks_diff += self.blocks_diff
+        self.sample_max_blocks_diff = max(
+            self.sample_max_blocks_diff, self.blocks_diff,
+        )
+        self.sample_gen0_diff += self.gen0_diff
+
+    def _reset_frame_counts(self):
+        self._allocated_blocks = sys.getallocatedblocks()
+        self._gen0_count = gc.get_count()[0]
+
+    def dump(self):
+        if not self.is_tracing:
+            self._start()
+
+        snapshot = self._take_snapshot()
+        node_counts = self.node_counts()
+        if self.dump_snapshot is None:
+            print("Allocation snapshot taken, press again to see the diff")
+        else:
+            self._print_diff(snapshot, node_counts)
+        self.dump_snapshot = snapshot
+        self.dump_node_counts = node_counts
+
+    def _print_diff(self, snapshot, node_counts):
+        print("Allocations diff by module:")
+        for stat in snapshot.compare_to(self.dump_snapshot, 'filename')[:5]:
+            print("  {}".format(stat))
+        print("Allocations diff by line:")
+        for stat in snapshot.compare_to(self.dump_snapshot, 'lineno')[:self.TOP_LINES]:
+            print("  {}".format(stat))
+        if self.last_frame_counts is not None:
+            print(
+                "Per frame: {:+.1f} allocated blocks (max {:+d}), "
+                "{:+.1f} gen0 objects".format(*self.last_frame_counts)
+            )
+        if self.last_sample:
+            print("Net allocations per frame:")
+            for location, size, count in self.last_sample:
+                print("  {}: {:+.1f} B, {:+.2f} blocks".format(location, size, count))
+        print("Live nodes:")
+        for root_name, counts in node_counts.items():
+            previous_counts = self.dump_node_counts[root_name]
+            for class_name in sorted(counts.keys() | previous_counts.keys()):
+                print("  {}/{}: {} ({:+d})".format(
+                    root_name, class_name, counts[class_name],
+                    counts[class_name] - previous_counts[class_name],
+                ))
+
+    def _start(self):
+        tracemalloc.start()
+        self.frames_count = 0
+        self.sample_snapshot = self._take_snapshot()
+        self._reset_frame_counts()
+        print("Allocation tracking started")
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
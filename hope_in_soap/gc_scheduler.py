@@ -0,0 +1,122 @@
+import gc
+import time
+
+
+class GCScheduler:
+    # Automatic collection is disabled while the scene is active, instead the
+    # young generations are collected in frames that have spare time and full
+    # collections are left for moments when a hitch is not noticeable (lane
+    # movement, game over). Everything alive at the start is frozen, so full
+    # collections do not have to traverse sprites, UI nodes and counters.
+    FRAME_BUDGET_MS = 16.
+    SPARE_MS_FOR_COLLECTION = 4.
+    GEN0_THRESHOLD = 700
+    GEN1_THRESHOLD = 10
+    GEN2_THRESHOLD = 10
+    # past these collections happen regardless of the frame budget
+    GEN0_HARD_LIMIT = 20000
+    GEN2_HARD_LIMIT = 100
+    SLOW_PAUSE_MS = 2.
+
+    def __init__(self):
+        self.is_active = False
+        self.frame_pause_ms = 0.
+        self.last_frame_pause_ms = 0.
+        self.max_pause_ms = 0.
+        self.slow_pauses_count = 0
+        self.collections_count = [0, 0, 0]
+        # time between frame_started calls, so rendering is included as well
+        self.last_frame_period_ms = 0.
+        self.max_frame_period_ms = 0.
+        self._outside_update_ms = 0.
+        self._update_ms = 0.
+        self._frame_started_at = None
+        self._collection_started_at = None
+
+    def prepare(self):
+        # full collection, run while loading so that start() is cheap,
+        # objects frozen by a previous scene may be garbage by now
+        gc.unfreeze()
+        gc.collect()
+
+    def start(self):
+        if self.is_active:
+            return
+        self.is_active = True
+        gc.callbacks.append(self._on_gc)
+        # only moves the tracked objects to the permanent generation
+        gc.freeze()
+        gc.disable()
+
+    def stop(self):
+        if not self.is_active:
+            return
+        self.is_active = False
+        gc.callbacks.remove(self._on_gc)
+        gc.unfreeze()
+        gc.enable()
+
+    def frame_started(self):
+        now = time.perf_counter()
+        if self._frame_started_at is not None:
+            self.last_frame_period_ms = (now - self._frame_started_at) * 1000.
+            self.max_frame_period_ms = max(
+                self.max_frame_period_ms, self.last_frame_period_ms,
+            )
+            # rendering and waiting for vsync in the last frame, assumed to
+            # take about as long in this one
+            self._outside_update_ms = max(
+                self.last_frame_period_ms - self._update_ms
+                - self.frame_pause_ms,
+                0.,
+            )
+        self._frame_started_at = now
+        self.last_frame_pause_ms = self.frame_pause_ms
+        self.frame_pause_ms = 0.
+
+    def frame_finished(self, *, pause_window: bool):
+        self._update_ms = (time.perf_counter() - self._frame_started_at) * 1000.
+        if not self.is_active:
+            return
+        spare_ms = (
+            self.FRAME_BUDGET_MS - self._update_ms - self._outside_update_ms
+        )
+        gen0_count, gen1_count, gen2_count = gc.get_count()
+        if pause_window and gen2_count >= self.GEN2_THRESHOLD:
+            gc.collect(2)
+        elif gen2_count >= self.GEN2_HARD_LIMIT:
+            gc.collect(2)
+        elif (
+            (spare_ms >= self.SPARE_MS_FOR_COLLECTION or pause_window)
+            and gen1_count >= self.GEN1_THRESHOLD
+        ):
+            gc.collect(1)
+        elif (
+            (spare_ms >= self.SPARE_MS_FOR_COLLECTION
+             and gen0_count >= self.GEN0_THRESHOLD)
+            or gen0_count >= self.GEN0_HARD_LIMIT
+        ):
+            gc.collect(0)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'last_frame_pause_ms': self.last_frame_pause_ms,
+            'last_frame_period_ms': self.last_frame_period_ms,
+            'max_frame_period_ms': self.max_frame_period_ms,
+            'max_pause_ms': self.max_pause_ms,
+            'slow_pauses': self.slow_pauses_count,
+            'collections': list(self.collections_count),
+        }
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._collection_started_at = time.perf_counter()
+        elif self._collection_started_at is not None:
+            pause_ms = (time.perf_counter() - self._collection_started_at) * 1000.
+            self._collection_started_at = None
+            self.frame_pause_ms += pause_ms
+            self.max_pause_ms = max(self.max_pause_ms, pause_ms)
+            if pause_ms > self.SLOW_PAUSE_MS:
+                self.slow_pauses_count += 1
+            self.collections_count[info['generation']] += 1
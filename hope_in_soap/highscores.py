@@ -0,0 +1,185 @@
+import os
+import queue
+import atexit
+import bisect
+import threading
+from array import array
+from pathlib import Path
+
+
+class NullHighScoresStore:
+    # used by bot sessions, so that they don't end up in the leaderboard
+    is_loaded = True
+    scores_count = 0
+
+    def record(self, score: int):
+        pass
+
+    def rank_of(self, score: int):
+        return None
+
+    def top(self, count: int):
+        return []
+
+    def close(self):
+        pass
+
+
+class HighScoresStore:
+    # The index is a large sorted array('q') of compacted scores plus a small
+    # sorted list of scores recorded since, ranks are the sum of both bisects.
+    # Recording only inserts into the small list, compaction merges both into
+    # a new array in chunks and swaps the reference, so the frame thread is
+    # never blocked by a copy of the whole index.
+    #
+    # On disk there is a sorted snapshot and numbered append-only journals.
+    # The snapshot header holds the number of the first journal it does not
+    # include, so a crash at any point of compaction neither loses scores nor
+    # replays them twice.
+    COMPACT_EVERY = 1000
+    IO_CHUNK = 65536
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.snapshot_path = directory / 'highscores.bin'
+        self._index = (array('q'), [])
+        self.is_loaded = False
+        self.journal_number = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def scores_count(self) -> int:
+        scores, recent_scores = self._index
+        return len(scores) + len(recent_scores)
+
+    def record(self, score: int):
+        self._queue.put(score)
+
+    def rank_of(self, score: int):
+        if not self.is_loaded:
+            return None
+        scores, recent_scores = self._index
+        return (
+            len(scores) - bisect.bisect_right(scores, score)
+            + len(recent_scores) - bisect.bisect_right(recent_scores, score)
+            + 1
+        )
+
+    def top(self, count: int):
+        if not self.is_loaded or count <= 0:
+            return []
+        scores, recent_scores = self._index
+        return sorted(
+            scores[-count:].tolist() + recent_scores[-count:], reverse=True,
+        )[:count]
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5.)
+
+    def _journal_path(self, number: int) -> Path:
+        return self.directory / 'highscores.{}.journal'.format(number)
+
+    def _journals(self):
+        return sorted(
+            (int(path.name.split('.')[1]), path)
+            for path in self.directory.glob('highscores.*.journal')
+        )
+
+    def _run(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+        journal = open(self._journal_path(self.journal_number), 'ab')
+        while True:
+            score = self._queue.get()
+            if score is None:
+                break
+            journal.write(array('q', [score]).tobytes())
+            journal.flush()
+            bisect.insort(self._index[1], score)
+            if len(self._index[1]) >= self.COMPACT_EVERY:
+                journal.close()
+                self._compact()
+                journal = open(self._journal_path(self.journal_number), 'ab')
+        journal.close()
+
+    def _load(self):
+        scores = array('q')
+        first_journal = 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'rb') as snapshot:
+                header = array('q')
+                self._read_into(header, snapshot, limit=1)
+                if header:
+                    first_journal = header[0]
+                    self._read_into(scores, snapshot)
+
+        recent_scores = []
+        journals = self._journals()
+        for number, path in journals:
+            if number < first_journal:
+                # already in the snapshot, left over by an interrupted compaction
+                path.unlink()
+                continue
+            journal_scores = array('q')
+            with open(path, 'rb') as journal:
+                self._read_into(journal_scores, journal)
+            os.truncate(path, len(journal_scores) * journal_scores.itemsize)
+            recent_scores.extend(journal_scores)
+        recent_scores.sort()
+
+        self.journal_number = max(
+            [first_journal] + [number for number, _ in journals]
+        )
+        self._index = (scores, recent_scores)
+        self.is_loaded = True
+        if len(recent_scores) >= self.COMPACT_EVERY:
+            self._compact()
+
+    def _read_into(self, scores: array, stream, limit=None):
+        while limit is None or len(scores) < limit:
+            size = self.IO_CHUNK if limit is None else limit - len(scores)
+            data = stream.read(size * scores.itemsize)
+            # ignore trailing bytes of a record that was cut short by a crash
+            data = data[:len(data) - len(data) % scores.itemsize]
+            if not data:
+                break
+            scores.frombytes(data)
+
+    def _compact(self):
+        scores, recent_scores = self._index
+        old_journal_number = self.journal_number
+        # scores recorded from now on go to a journal the snapshot won't include
+        self.journal_number += 1
+
+        merged = array('q')
+        start = 0
+        for score in recent_scores:
+            end = bisect.bisect_right(scores, score, start)
+            self._extend_chunked(merged, scores, start, end)
+            merged.append(score)
+            start = end
+        self._extend_chunked(merged, scores, start, len(scores))
+
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as snapshot:
+            snapshot.write(array('q', [self.journal_number]).tobytes())
+            for i in range(0, len(merged), self.IO_CHUNK):
+                snapshot.write(merged[i:i + self.IO_CHUNK].tobytes())
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        self._index = (merged, [])
+        for number, path in self._journals():
+            if number <= old_journal_number:
+                path.unlink()
+
+    def _extend_chunked(self, target: array, source: array, start: int, end: int):
+        for i in range(start, end, self.IO_CHUNK):
+            target.extend(source[i:min(i + self.IO_CHUNK, end)])
@@ -0,0 +1,4 @@
+# Plain numbers only, so that headless code (vecenv) can use them without kaa.
+LANE_X_POSITIONS = [3 + (109 * i) for i in range(-2, 3)]
+LANE_HERO_Y = 220
+LANE_ENEMY_Y = -500
@@ -1,35 +1,86 @@
+import time
 import random
+import collections
+import typing
 
 from kaa.nodes import Node
-from kaa.fonts import TextNode, Font
+from kaa.fonts import TextNode
 from kaa.geometry import Polygon, Vector, Alignment
 from kaa.colors import Color
 from kaa.transitions import (
     NodeTransitionsSequence, NodeTransitionsParallel, NodeTransitionCallback,
-    NodeTransitionDelay, NodeTransition,
+    NodeTransition,
 )
 
 from .constants import (
     LANE_HERO_SLOTS, SPRITE_SOAP_METER, SPRITE_LIQUID_SOAP,
-    SPRITE_ANTIVIRUS, SPRITE_FRAMES_PEOPLE,
+    SPRITE_ANTIVIRUS, SPRITE_FRAMES_PEOPLE, SPRITE_BUBBLE, SPRITE_MONEY,
+    FONT_PIXELED, Layer, layer_z,
 )
 from .nodes import (
-    SoapNode, OilRunner, MiniSoapRunner, VirusRunner,
+    SoapNode, LaneRunnerBase, OilRunner, MiniSoapRunner, VirusRunner,
     LiquidSoapRunner, AntivirusRunner, CounterStatusUINode
 )
+from .particles import ParticleEmitter
+
+
+class CollisionsManager:
+    # Collision begin events are only recorded during the physics step and
+    # applied in one pass from the scene update. Only the first event for
+    # each body is kept.
+    def __init__(self):
+        self.pending = {}
+        self.frame_counts = collections.Counter()
+        self.last_frame_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+
+    def push(self, trigger_pair: tuple, body):
+        self.frame_counts[trigger_pair] += 1
+        self.pending.setdefault(body, trigger_pair)
+
+    def drain(self):
+        events = self.pending
+        self.pending = {}
+        self.total_counts.update(self.frame_counts)
+        self.last_frame_counts = self.frame_counts
+        self.frame_counts = collections.Counter()
+        return events.items()
 
 
 class EffectsManager:
-    def __init__(self, *, root_node, camera):
+    def __init__(self, *, root_node, camera, lazy=False):
         self.camera = camera
         self.flasher = root_node.add_child(
             Node(
                 shape=Polygon.from_box(Vector(1400, 800)),
                 color=Color(0., 0., 0., 0.),
-                z_index=100,
+                z_index=Layer.overlay,
             )
         )
         self.camera_shake_ticks = 0
+        self.bubbles = ParticleEmitter(
+            root_node=root_node,
+            sprite=SPRITE_BUBBLE,
+            z_index=Layer.particles,
+            lazy=lazy,
+        )
+        self.money = ParticleEmitter(
+            root_node=root_node,
+            sprite=SPRITE_MONEY,
+            z_index=layer_z(Layer.particles, 1),
+            max_particles=1024,
+            pool_size=64,
+            gravity=600.,
+            scale=0.3,
+            lazy=lazy,
+        )
+
+    def populate_particles(self, amount: int) -> bool:
+        for emitter in (self.bubbles, self.money):
+            if not emitter.is_populated:
+                emitter.populate(amount)
+                break
+        return self.bubbles.is_populated and self.money.is_populated
 
     def flash(self):
         self.camera_shake_ticks = 15
@@ -42,6 +93,34 @@ class EffectsManager:
             )
         ]
 
+    def burst_bubbles(self, position: Vector):
+        self.bubbles.emit(position, 24)
+
+    def burst_money(self, position: Vector):
+        self.money.emit(position, 12)
+
+    def update_particles(self, dt: int):
+        self.bubbles.update(dt)
+        self.money.update(dt)
+
+    @property
+    def particles_stats(self) -> dict:
+        return {
+            'bubbles': self.bubbles.stats,
+            'money': self.money.stats,
+        }
+
+    @property
+    def particles_frame_ms(self) -> float:
+        return sum(
+            emitter.last_update_ms + emitter.last_render_ms
+            for emitter in (self.bubbles, self.money)
+        )
+
+    @property
+    def particles_count(self) -> int:
+        return self.bubbles.count + self.money.count
+
     def update_camera(self):
         if self.camera_shake_ticks:
             if self.camera_shake_ticks > 1:
@@ -56,29 +135,23 @@ class EffectsManager:
     def reset(self):
         self.camera_shake_ticks = 0
         self.camera.position = Vector(0, 0)
+        self.bubbles.clear()
+        self.money.clear()
 
 
 class RunnersManager:
-    def __init__(self, *, space_node):
+    def __init__(self, *, space_node, effects_manager, timers):
         self.space_node = space_node
+        self.effects_manager = effects_manager
+        self.timers = timers
         self.speed_mod = 0.
         self.slowdown_power = 0
 
-        self.space_node.transitions_manager.set(
-            'spawn_periodic', NodeTransitionsSequence(
-                [
-                    NodeTransitionDelay(200),
-                    NodeTransitionCallback(lambda _: self.spawn_runner()),
-                ], loops=0,
-            )
+        self.timers.schedule(
+            'spawn_periodic', 200, self.spawn_runner, repeat=True,
         )
-        self.space_node.transitions_manager.set(
-            'update_speed_mod_periodic', NodeTransitionsSequence(
-                [
-                    NodeTransitionDelay(300),
-                    NodeTransitionCallback(lambda _: self.update_speed_mod()),
-                ], loops=0,
-            )
+        self.timers.schedule(
+            'update_speed_mod_periodic', 300, self.update_speed_mod, repeat=True,
         )
 
     def spawn_runner(self):
@@ -100,7 +173,7 @@ class RunnersManager:
                     speed_mod *= 0.65 ** self.slowdown_power
                     faded = True
             self.space_node.add_child(
-                runner_cls(speed_mod=self.speed_mod, faded=faded, z_index=20)
+                runner_cls(speed_mod=self.speed_mod, faded=faded, z_index=Layer.runners)
             )
 
     def update_speed_mod(self):
@@ -108,7 +181,11 @@ class RunnersManager:
 
     def nuke_enemies(self):
         for child_node in self.space_node.children:
-            if isinstance(child_node, VirusRunner):
+            if (
+                isinstance(child_node, VirusRunner)
+                and not child_node.is_destroying
+            ):
+                self.effects_manager.burst_bubbles(child_node.position)
                 child_node.handle_destruction()
 
     def slowdown_enemies(self):
@@ -118,18 +195,86 @@ class RunnersManager:
                 child_node.slowdown(0.65)
                 child_node.fade()
 
-        self.space_node.transitions_manager.set(
-            'slowndown_cancel', NodeTransitionsSequence(
-                [
-                    NodeTransitionDelay(5000),
-                    NodeTransitionCallback(lambda _: self._on_cancel_slowdown()),
-                ],
-            )
-        )
+        self.timers.schedule('slowdown_cancel', 5000, self._on_cancel_slowdown)
 
     def _on_cancel_slowdown(self):
         self.slowdown_power = 0
 
+    def pause_runners(self):
+        for child_node in self.space_node.children:
+            if isinstance(child_node, LaneRunnerBase):
+                child_node.pause()
+
+    def resume_runners(self):
+        for child_node in self.space_node.children:
+            if isinstance(child_node, LaneRunnerBase):
+                child_node.resume()
+
+
+class PowerSaveManager:
+    FRAME_INTERVAL_MS = 100.
+    GAME_OVER_IDLE_MS = 3000.
+
+    def __init__(self, *, timers, scrolling_nodes, runners_manager,
+                 disabled=False):
+        self.timers = timers
+        self.scrolling_nodes = scrolling_nodes
+        self.runners_manager = runners_manager
+        # autopilot and soak runs must keep going at full rate
+        self.is_disabled = disabled
+        self.is_active = False
+        self.is_window_focused = True
+        self.idle_ms = 0.
+        self._last_frame_at = time.perf_counter()
+
+    def wake(self):
+        self.idle_ms = 0.
+        self.exit()
+
+    def handle_focus(self, is_focused: bool):
+        self.is_window_focused = is_focused
+        if is_focused:
+            self.wake()
+
+    def update(self, dt: int, *, game_over: bool):
+        self.idle_ms += dt
+        # gameplay is paused while active, during play that's only wanted
+        # when the player can't see the window
+        if not self.is_window_focused or (
+            game_over and self.idle_ms >= self.GAME_OVER_IDLE_MS
+        ):
+            self.enter()
+        else:
+            self.exit()
+
+    def enter(self):
+        if self.is_active or self.is_disabled:
+            return
+        self.is_active = True
+        self.timers.pause('power_save')
+        for node in self.scrolling_nodes:
+            node.pause_scrolling()
+        self.runners_manager.pause_runners()
+
+    def exit(self):
+        if not self.is_active:
+            return
+        self.is_active = False
+        self.timers.resume('power_save')
+        for node in self.scrolling_nodes:
+            node.resume_scrolling()
+        self.runners_manager.resume_runners()
+
+    def throttle(self):
+        if self.is_active:
+            remaining_ms = (
+                self.FRAME_INTERVAL_MS
+                - (time.perf_counter() - self._last_frame_at) * 1000.
+            )
+            if remaining_ms > 0:
+                time.sleep(remaining_ms / 1000.)
+        self._last_frame_at = time.perf_counter()
+
 
 class PowerupsManager:
     def __init__(self, *, player_state, runners_manager):
@@ -148,13 +293,14 @@ class PowerupsManager:
 
 
 class PlayerManager:
-    def __init__(self, *, player_state, space_node, effects_manager):
+    def __init__(self, *, player_state, space_node, effects_manager, timers):
         self.player_state = player_state
         self.space_node = space_node
         self.effects_manager = effects_manager
+        self.timers = timers
         self.soap = self.space_node.add_child(
             SoapNode(
-                z_index=30,
+                z_index=Layer.player,
             )
         )
         self.is_moving = False
@@ -173,23 +319,23 @@ class PlayerManager:
     def handle_enemy_kill(self, enemy_node):
         self.player_state.score += 10
         self.player_state.people_counter.increase(1)
+        self.effects_manager.burst_bubbles(enemy_node.position)
 
     def handle_enemy_missed(self, enemy_node):
         self.player_state.people_counter.decrease(50)
         self.effects_manager.flash()
 
     def handle_pickup_grab(self, pickup_node):
+        self.effects_manager.burst_money(pickup_node.position)
         if isinstance(pickup_node, OilRunner):
             if not self.is_frozen:
                 self.is_frozen = True
                 self.soap.transitions_manager.set(
                     'frozen',
-                    NodeTransitionsSequence([
-                        NodeTransition(Node.color, Color(0.5, 0.5, 0.5),
-                                       duration=400., back_and_forth=True),
-                        NodeTransitionCallback(self._on_end_frozen),
-                    ])
+                    NodeTransition(Node.color, Color(0.5, 0.5, 0.5),
+                                   duration=400., back_and_forth=True),
                 )
+                self.timers.schedule('frozen', 800, self._on_end_frozen)
         elif isinstance(pickup_node, MiniSoapRunner):
             self.player_state.soap_meter_counter.increase(10000)
         elif isinstance(pickup_node, LiquidSoapRunner):
@@ -234,14 +380,26 @@ class PlayerManager:
         self.is_moving = False
         self._process_movement()
 
-    def _on_end_frozen(self, _):
+    def _on_end_frozen(self):
         self.is_frozen = False
         self._process_movement()
 
 
 class UIManager:
-    def __init__(self, player_state, root_node):
+    def __init__(self, *, player_state, root_node, lazy=False):
         self.player_state = player_state
+        self.is_constructed = False
+        self._construction_steps = self._construct(root_node)
+        if not lazy:
+            while not self.construct_step():
+                pass
+
+    def construct_step(self) -> bool:
+        if not self.is_constructed:
+            next(self._construction_steps, None)
+        return self.is_constructed
+
+    def _construct(self, root_node):
         self.ui_root = root_node.add_child(
             Node(
                 position=Vector(0, 240),
@@ -252,7 +410,7 @@ class UIManager:
                 position=Vector(320, 20),
                 origin_alignment=Alignment.left,
                 sprite=SPRITE_SOAP_METER,
-                z_index=50,
+                z_index=Layer.ui,
             )
         )
 
@@ -261,24 +419,26 @@ class UIManager:
                 # scale=Vector(1.1, 1),
                 position=Vector(320, -15),
                 origin_alignment=Alignment.top_left,
-                font=Font('hope_in_soap/assets/Pixeled_0.ttf'),
+                font=FONT_PIXELED,
                 font_size=42.,
                 text="Soap-o-meter",
-                z_index=50,
+                z_index=Layer.ui,
             )
         )
+        yield
 
         self.score = self.ui_root.add_child(
             TextNode(
                 # scale=Vector(1.1, 1),
                 position=Vector(-470, -15),
                 origin_alignment=Alignment.top_left,
-                font=Font('hope_in_soap/assets/Pixeled_0.ttf'),
+                font=FONT_PIXELED,
                 font_size=36.,
                 text="Score: 123",
-                z_index=50,
+                z_index=Layer.ui,
             )
         )
+        yield
 
         self.liquid_soap_powerup_status = self.ui_root.add_child(
             CounterStatusUINode(
@@ -295,15 +455,17 @@ class UIManager:
                 max_count=3,
             )
         )
+        yield
+
         self.people_label = self.ui_root.add_child(
             TextNode(
                 # scale=Vector(1.1, 1),
                 position=Vector(-620, -15),
                 origin_alignment=Alignment.top_left,
-                font=Font('hope_in_soap/assets/Pixeled_0.ttf'),
+                font=FONT_PIXELED,
                 font_size=36.,
                 text="People:",
-                z_index=50,
+                z_index=Layer.ui,
             )
         )
         self.people_status = self.ui_root.add_child(
@@ -314,28 +476,47 @@ class UIManager:
                 break_count=40,
                 minor_sep=Vector(7, 0),
                 major_sep=Vector(0, 12),
+                # hundreds of nodes, filled in chunks by populate_counters()
+                lazy=True,
             )
         )
+        yield
 
         self.game_over_background = root_node.add_child(
             Node(
                 shape=Polygon.from_box(Vector(1400, 1000)),
                 color=Color(0, 0, 0, 0),
                 visible=False,
-                z_index=150,
+                z_index=Layer.game_over,
             )
         )
         self.game_over_text = self.game_over_background.add_child(
             TextNode(
                 font_size=56.,
-                font=Font('hope_in_soap/assets/Pixeled_0.ttf'),
+                font=FONT_PIXELED,
                 text="GAME OVER",
                 color=Color(0, 0, 0, 0),
-                z_index=151,
+                z_index=Layer.game_over_text,
+            )
+        )
+        yield
+
+        self.game_over_rank_text = self.game_over_background.add_child(
+            TextNode(
+                position=Vector(0, 80),
+                font_size=36.,
+                font=FONT_PIXELED,
+                text="",
+                color=Color(0, 0, 0, 0),
+                z_index=Layer.game_over_text,
             )
         )
+        self.is_constructed = True
 
-    def show_game_over(self):
+    def populate_counters(self, amount: int) -> bool:
+        return self.people_status.populate(amount)
+
+    def show_game_over(self, rank: typing.Optional[int] = None):
         self.game_over_background.visible = True
         self.game_over_background.transition = NodeTransition(
             Node.color, Color(0, 0, 0, 0.8), duration=30000,
@@ -343,6 +524,11 @@ class UIManager:
         self.game_over_text.transition = NodeTransition(
             Node.color, Color(1, 1, 1, 1), duration=3000,
         )
+        if rank is not None:
+            self.game_over_rank_text.text = "Rank: #{}".format(rank)
+            self.game_over_rank_text.transition = NodeTransition(
+                Node.color, Color(1, 1, 1, 1), duration=3000,
+            )
 
     def update_ui(self):
         fuel_level = (
@@ -12,7 +12,7 @@ from kaa.transitions import (
 )
 
 from .constants import (
-    CollisionTrigger,
+    CollisionTrigger, Layer, layer_z,
     SPRITE_FRAMES_SOAP, SPRITE_FRAMES_MINI_SOAP, SPRITE_FRAMES_VIRUS,
     LANE_ENEMY_SLOTS, LANE_HERO_SLOTS, SPRITE_OIL,
     SPRITE_LIQUID_SOAP, SPRITE_ANTIVIRUS
@@ -22,13 +22,9 @@ from .constants import (
 class VerticalScrollingNode(Node):
     def __init__(self, *, repeat_sprite, scroll_duration, z_index, **kwargs):
         self.vertical_move = repeat_sprite.dimensions.y
-        super().__init__(
-            transition=NodeTransition(
-                Node.position, Vector(0., self.vertical_move),
-                loops=0, duration=scroll_duration
-            ),
-            **kwargs,
-        )
+        self.scroll_duration = scroll_duration
+        super().__init__(**kwargs)
+        self.resume_scrolling()
 
         self.repeat_1 = self.add_child(Node(
             sprite=repeat_sprite,
@@ -40,6 +36,17 @@ class VerticalScrollingNode(Node):
             z_index=z_index,
         ))
 
+    def pause_scrolling(self):
+        self.transition = None
+
+    def resume_scrolling(self):
+        # looping transition restarts from its initial position on every loop
+        self.position = Vector(0., 0.)
+        self.transition = NodeTransition(
+            Node.position, Vector(0., self.vertical_move),
+            loops=0, duration=self.scroll_duration
+        )
+
 
 class SoapNode(BodyNode):
     SPRITE_FRAMES = SPRITE_FRAMES_SOAP
@@ -63,7 +70,7 @@ class SoapNode(BodyNode):
                 trigger_id=CollisionTrigger.soap,
                 shape=Polygon.from_box(Vector(138, 330)),
                 # color=Color(1., 0., 0., 0.5),
-                z_index=100,
+                z_index=Layer.overlay,
             )
         )
 
@@ -97,13 +104,14 @@ class LaneRunnerBase(BodyNode):
             **kwargs,
         )
         self._is_destroying = False
+        self._paused_velocities = None
 
         self.hitbox = self.add_child(
             HitboxNode(
                 trigger_id=self.TRIGGER_ID,
                 shape=Circle(48.),
                 # color=Color(1., 0., 0., 0.5),
-                z_index=100,
+                z_index=Layer.overlay,
             )
         )
 
@@ -118,6 +126,10 @@ class LaneRunnerBase(BodyNode):
         if faded:
             self.color = Color(0.5, 0.5, 0.5, 1.)
 
+    @property
+    def is_destroying(self) -> bool:
+        return self._is_destroying
+
     def handle_destruction(self):
         if self._is_destroying:
             return
@@ -142,6 +154,17 @@ class LaneRunnerBase(BodyNode):
     def slowdown(self, fraction: float):
         self.velocity *= fraction
 
+    def pause(self):
+        if self._paused_velocities is None:
+            self._paused_velocities = (self.velocity, self.angular_velocity)
+            self.velocity = Vector(0, 0)
+            self.angular_velocity = 0.
+
+    def resume(self):
+        if self._paused_velocities is not None:
+            self.velocity, self.angular_velocity = self._paused_velocities
+            self._paused_velocities = None
+
 
 class VirusRunner(LaneRunnerBase):
     SPRITE_FRAMES = SPRITE_FRAMES_VIRUS
@@ -175,26 +198,46 @@ class CounterStatusUINode(Node):
             max_count: int, break_count: int = 0,
             minor_sep: Vector = Vector(0, -30),
             major_sep: Vector = Vector(100, 0),
+            lazy: bool = False,
     ):
         super().__init__(position=position)
-        self.single_powerups = [
-            self.add_child(
-                Node(
-                    position=self._calculate_position(i, break_count,
-                                                      minor_sep, major_sep),
-                    sprite=(
-                        random.choice(powerup_sprite)
-                        if isinstance(powerup_sprite, list)
-                        else powerup_sprite
-                    ),
-                    z_index=50 + i,
-                    # start hidden
-                    scale=Vector(0., 0.),
-                    color=Color(1., 1., 1., 0.),
-                )
-            ) for i in range(max_count)
-        ]
+        self.powerup_sprite = powerup_sprite
+        self.max_count = max_count
+        self.break_count = break_count
+        self.minor_sep = minor_sep
+        self.major_sep = major_sep
+        self.single_powerups = []
         self.current_count = 0
+        if not lazy:
+            self.populate(max_count)
+
+    @property
+    def is_populated(self) -> bool:
+        return len(self.single_powerups) == self.max_count
+
+    def populate(self, amount: int) -> bool:
+        start = len(self.single_powerups)
+        for i in range(start, min(start + amount, self.max_count)):
+            self.single_powerups.append(
+                self.add_child(
+                    Node(
+                        position=self._calculate_position(
+                            i, self.break_count, self.minor_sep, self.major_sep,
+                        ),
+                        sprite=(
+                            random.choice(self.powerup_sprite)
+                            if isinstance(self.powerup_sprite, list)
+                            else self.powerup_sprite
+                        ),
+                        # overlapping icons, later ones are drawn on top
+                        z_index=layer_z(Layer.ui, 1 + i),
+                        # start hidden
+                        scale=Vector(0., 0.),
+                        color=Color(1., 1., 1., 0.),
+                    )
+                )
+            )
+        return self.is_populated
 
     def _calculate_position(self, index: int, break_count: int,
                             minor_sep: Vector, major_sep: Vector):
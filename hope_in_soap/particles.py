@@ -0,0 +1,128 @@
+import time
+
+import numpy as np
+from kaa.nodes import Node
+from kaa.geometry import Vector
+
+
+# Particles live in preallocated numpy arrays (alive ones packed at the front)
+# and are simulated with a handful of vectorized operations. Rendering goes
+# through a small fixed pool of nodes showing the youngest particles only.
+class ParticleEmitter:
+    def __init__(self, *, root_node, sprite, z_index,
+                 max_particles=4096, pool_size=128,
+                 lifetime=(600., 1200.), speed=(60., 240.),
+                 gravity=-300., scale=0.4, lazy=False):
+        self.max_particles = max_particles
+        self.lifetime = lifetime
+        self.speed = speed
+        self.gravity = gravity
+        self.base_scale = scale
+
+        self.count = 0
+        self.position = np.zeros((max_particles, 2), dtype=np.float32)
+        self.velocity = np.zeros((max_particles, 2), dtype=np.float32)
+        self.life = np.zeros(max_particles, dtype=np.float32)
+        self.max_life = np.ones(max_particles, dtype=np.float32)
+
+        self.root_node = root_node
+        self.sprite = sprite
+        self.z_index = z_index
+        self.pool_size = pool_size
+        self.pool = []
+        self.rendered_count = 0
+        if not lazy:
+            self.populate(pool_size)
+
+        self.dropped_count = 0
+        self.last_update_ms = 0.
+        self.last_render_ms = 0.
+        self.max_update_ms = 0.
+
+    @property
+    def is_populated(self) -> bool:
+        return len(self.pool) == self.pool_size
+
+    def populate(self, amount: int) -> bool:
+        for _ in range(min(amount, self.pool_size - len(self.pool))):
+            self.pool.append(
+                self.root_node.add_child(
+                    Node(
+                        sprite=self.sprite,
+                        z_index=self.z_index,
+                        visible=False,
+                    )
+                )
+            )
+        return self.is_populated
+
+    def emit(self, position: Vector, amount: int):
+        amount = min(amount, self.max_particles - self.count)
+        if amount <= 0:
+            self.dropped_count += 1
+            return
+        new = slice(self.count, self.count + amount)
+        angles = np.random.uniform(0., 2 * np.pi, amount)
+        speeds = np.random.uniform(*self.speed, amount)
+        self.position[new] = (position.x, position.y)
+        self.velocity[new, 0] = np.cos(angles) * speeds
+        self.velocity[new, 1] = np.sin(angles) * speeds
+        self.life[new] = self.max_life[new] = np.random.uniform(
+            *self.lifetime, amount
+        )
+        self.count += amount
+
+    def update(self, dt: int):
+        started_at = time.perf_counter()
+        if self.count:
+            alive = slice(0, self.count)
+            seconds = dt / 1000.
+            self.velocity[alive, 1] += self.gravity * seconds
+            self.position[alive] += self.velocity[alive] * seconds
+            self.life[alive] -= dt
+
+            keep = self.life[alive] > 0.
+            survivors = int(np.count_nonzero(keep))
+            if survivors < self.count:
+                for array in (self.position, self.velocity,
+                              self.life, self.max_life):
+                    array[:survivors] = array[alive][keep]
+                self.count = survivors
+        self.last_update_ms = (time.perf_counter() - started_at) * 1000.
+        self.max_update_ms = max(self.max_update_ms, self.last_update_ms)
+
+        started_at = time.perf_counter()
+        self._render()
+        self.last_render_ms = (time.perf_counter() - started_at) * 1000.
+
+    def _render(self):
+        shown_count = min(self.count, len(self.pool))
+        # youngest particles are at the back of the packed arrays
+        first = self.count - shown_count
+        positions = self.position[first:self.count].tolist()
+        scales = (
+            self.base_scale * self.life[first:self.count]
+            / self.max_life[first:self.count]
+        ).tolist()
+        for node, (x, y), scale in zip(self.pool, positions, scales):
+            node.position = Vector(x, y)
+            node.scale = Vector(scale, scale)
+            node.visible = True
+        for node in self.pool[shown_count:self.rendered_count]:
+            node.visible = False
+        self.rendered_count = shown_count
+
+    def clear(self):
+        self.count = 0
+        self._render()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'particles': self.count,
+            'rendered': self.rendered_count,
+            'dropped_bursts': self.dropped_count,
+            'update_ms': self.last_update_ms,
+            'max_update_ms': self.max_update_ms,
+            'render_ms': self.last_render_ms,
+        }
@@ -1,7 +1,9 @@
 import random
+import time
 
-from kaa.engine import Scene
+from kaa.engine import Scene, get_engine
 from kaa.colors import Color
+from kaa.fonts import TextNode
 from kaa.geometry import Vector, Segment
 from kaa.input import Keycode
 from kaa.nodes import Node
@@ -11,20 +13,53 @@ from kaa.physics import (
 )
 
 from .constants import (
-    CollisionTrigger,
+    CollisionTrigger, Layer, layer_z,
     SPRITE_HAND, SPRITE_WATER_BACK, SPRITE_WATER_FRONT,
+    SPRITE_MENU_BACKGROUND, SPRITE_MENU_PAGE, SPRITE_LOGO, FONT_PIXELED,
+)
+from .autopilot import Autopilot
+from .gc_scheduler import GCScheduler
+from .debug import (
+    print_z_layers_report, print_particles_report, AllocationTracker,
 )
 from .nodes import VerticalScrollingNode
 from .states import PlayerState
+from .timers import TimerWheel
 from .managers import (
-    PlayerManager, PowerupsManager, RunnersManager, EffectsManager, UIManager
+    PlayerManager, PowerupsManager, RunnersManager, EffectsManager, UIManager,
+    PowerSaveManager, CollisionsManager,
 )
 
 
 class GameplayScene(Scene):
-    def __init__(self):
+    COUNTER_POPULATE_CHUNK = 50
+    PARTICLES_POPULATE_CHUNK = 32
+
+    def __init__(self, *, high_scores, preload=False, autopilot=False,
+                 soak_monitor=None):
         self.camera.position = Vector(0, 0)
         self.game_over = False
+        self.high_scores = high_scores
+        self.use_autopilot = autopilot
+        self.soak_monitor = soak_monitor
+        self.is_constructed = False
+        self._construction_steps = self._construct()
+        if not preload:
+            self.finish_construction()
+
+    def construct_step(self) -> bool:
+        if not self.is_constructed:
+            next(self._construction_steps, None)
+        return self.is_constructed
+
+    def finish_construction(self):
+        while not self.construct_step():
+            pass
+
+    def _construct(self):
+        self.collisions_manager = CollisionsManager()
+        self.timers = TimerWheel()
+        self.gc_scheduler = GCScheduler()
 
         # physics setup
         self.space = self.root.add_child(
@@ -44,7 +79,7 @@ class GameplayScene(Scene):
                               Vector(600, 0)),
                 trigger_id=CollisionTrigger.border,
                 # color=Color(1., 0., 0., 0.5),
-                z_index=100,
+                z_index=Layer.overlay,
             )
         )
         self.space.set_collision_handler(
@@ -63,30 +98,45 @@ class GameplayScene(Scene):
             CollisionTrigger.border, CollisionTrigger.runner_pickup,
             self.on_collision_border_pickup, phases_mask=CollisionPhase.begin,
         )
+        yield
 
         # background parallax effect
         self.water_back = self.root.add_child(
             VerticalScrollingNode(
                 repeat_sprite=SPRITE_WATER_BACK,
                 scroll_duration=9000.,
-                z_index=-10,
+                z_index=Layer.background,
             )
         )
         self.water_front = self.root.add_child(
             VerticalScrollingNode(
                 repeat_sprite=SPRITE_WATER_FRONT,
                 scroll_duration=3000.,
-                z_index=10,
+                z_index=Layer.water_front,
             )
         )
+        yield
 
         self.player_state = PlayerState()
         self.effects_manager = EffectsManager(
             root_node=self.root,
             camera=self.camera,
+            lazy=True,
         )
+        yield
+
+        while not self.effects_manager.populate_particles(
+            self.PARTICLES_POPULATE_CHUNK,
+        ):
+            yield
+        # first update allocates render buffers of the particle pools
+        self.effects_manager.update_particles(0)
+        yield
+
         self.runners_manager = RunnersManager(
             space_node=self.space,
+            effects_manager=self.effects_manager,
+            timers=self.timers,
         )
         self.powerups_manager = PowerupsManager(
             player_state=self.player_state,
@@ -96,36 +146,120 @@ class GameplayScene(Scene):
             player_state=self.player_state,
             space_node=self.space,
             effects_manager=self.effects_manager,
+            timers=self.timers,
         )
+        yield
+
         self.ui_manager = UIManager(
             player_state=self.player_state,
             root_node=self.root,
+            lazy=True,
+        )
+        while not self.ui_manager.construct_step():
+            yield
+
+        self.power_save_manager = PowerSaveManager(
+            timers=self.timers,
+            scrolling_nodes=[self.water_back, self.water_front],
+            runners_manager=self.runners_manager,
+            disabled=self.use_autopilot,
+        )
+        self.allocation_tracker = AllocationTracker(
+            tracked_roots={
+                'space': self.space,
+                'ui': self.ui_manager.ui_root,
+            },
         )
+        self.autopilot = Autopilot(
+            player_manager=self.player_manager,
+            powerups_manager=self.powerups_manager,
+            runners_manager=self.runners_manager,
+            player_state=self.player_state,
+        ) if self.use_autopilot else None
+        yield
+
+        while not self.ui_manager.populate_counters(self.COUNTER_POPULATE_CHUNK):
+            yield
+        yield
+
+        self.gc_scheduler.prepare()
+        self.is_constructed = True
+
+    def on_enter(self):
+        self.finish_construction()
+        # long-lived objects are in place now, freeze them
+        self.gc_scheduler.start()
+
+    def on_exit(self):
+        self.gc_scheduler.stop()
 
     def on_collision_soap_enemy(self, arbiter, soap_pair, enemy_pair):
-        if not self.game_over:
-            self.player_manager.handle_enemy_kill(enemy_pair.body)
-            enemy_pair.body.handle_destruction()
+        self.collisions_manager.push(
+            (CollisionTrigger.soap, CollisionTrigger.runner_enemy),
+            enemy_pair.body,
+        )
 
     def on_collision_border_enemy(self, arbiter, border_pair, enemy_pair):
-        if not self.game_over:
-            self.player_manager.handle_enemy_missed(enemy_pair.body)
-            enemy_pair.body.handle_destruction()
+        self.collisions_manager.push(
+            (CollisionTrigger.border, CollisionTrigger.runner_enemy),
+            enemy_pair.body,
+        )
 
     def on_collision_soap_pickup(self, arbiter, soap_pair, pickup_pair):
-        if not self.game_over:
-            self.player_manager.handle_pickup_grab(pickup_pair.body)
-            pickup_pair.body.handle_destruction()
+        self.collisions_manager.push(
+            (CollisionTrigger.soap, CollisionTrigger.runner_pickup),
+            pickup_pair.body,
+        )
 
     def on_collision_border_pickup(self, arbiter, border_pair, pickup_pair):
-        if not self.game_over:
-            pickup_pair.body.handle_destruction()
+        self.collisions_manager.push(
+            (CollisionTrigger.border, CollisionTrigger.runner_pickup),
+            pickup_pair.body,
+        )
+
+    def apply_collisions(self):
+        for runner, (trigger, runner_trigger) in self.collisions_manager.drain():
+            if self.game_over or runner.is_destroying:
+                continue
+            if runner_trigger == CollisionTrigger.runner_enemy:
+                if trigger == CollisionTrigger.soap:
+                    self.player_manager.handle_enemy_kill(runner)
+                else:
+                    self.player_manager.handle_enemy_missed(runner)
+            elif trigger == CollisionTrigger.soap:
+                self.player_manager.handle_pickup_grab(runner)
+            runner.handle_destruction()
 
     def update(self, dt):
+        self.gc_scheduler.frame_started()
+        # power save pauses the gameplay, runners are stopped and timers too
+        is_paused = self.power_save_manager.is_active
+        if not is_paused:
+            self.apply_collisions()
+            self.timers.tick(dt)
+            self.effects_manager.update_particles(dt)
+
         for event in self.input.events():
+            if event.window:
+                if event.window.is_focus_lost:
+                    self.power_save_manager.handle_focus(False)
+                elif event.window.is_focus_gained:
+                    self.power_save_manager.handle_focus(True)
+            if event.keyboard_key or event.mouse_button:
+                self.power_save_manager.wake()
             if event.keyboard_key:
                 pressed_key = event.keyboard_key.key
-                if not self.game_over:
+                if event.keyboard_key.is_key_down:
+                    if pressed_key == Keycode.f2:
+                        print_z_layers_report(self.root)
+                        print_particles_report(
+                            self.effects_manager.particles_stats,
+                        )
+                    elif pressed_key == Keycode.f3:
+                        self.allocation_tracker.toggle()
+                    elif pressed_key == Keycode.f4:
+                        self.allocation_tracker.dump()
+                if not self.game_over and not is_paused:
                     if event.keyboard_key.is_key_down:
                         if pressed_key == Keycode.a or pressed_key == Keycode.left:
                             self.player_manager.move_left(True)
@@ -141,7 +275,10 @@ class GameplayScene(Scene):
                         elif pressed_key == Keycode.d or pressed_key == Keycode.right:
                             self.player_manager.move_right(False)
 
-        if not self.game_over:
+        if self.autopilot is not None and not self.game_over and not is_paused:
+            self.autopilot.update()
+
+        if not self.game_over and not is_paused:
             self.effects_manager.update_camera()
             self.player_manager.consume_fuel(dt)
             self.ui_manager.update_ui()
@@ -149,7 +286,120 @@ class GameplayScene(Scene):
                 self.player_state.people_counter == 0
                 or self.player_state.soap_meter_counter == 0
             ):
-                self.game_over = True
-                self.player_manager.kill()
-                self.ui_manager.show_game_over()
+                if self.soak_monitor is not None:
+                    # runners keep getting faster until the bot cannot keep
+                    # up, a soak run refills the counters, drops the speed
+                    # back and keeps going in the same scene
+                    self.soak_monitor.rescues_count += 1
+                    self.player_state.people_counter.reset()
+                    self.player_state.soap_meter_counter.reset()
+                    self.runners_manager.speed_mod = 0.
+                else:
+                    self.game_over = True
+                    self.timers.pause('game_over')
+                    self.player_manager.kill()
+                    self.high_scores.record(self.player_state.score)
+                    self.ui_manager.show_game_over(
+                        rank=self.high_scores.rank_of(self.player_state.score),
+                    )
+                    self.power_save_manager.wake()
+
+        if self.soak_monitor is not None:
+            self.soak_monitor.update(dt, scene=self)
+        self.allocation_tracker.update()
+        self.gc_scheduler.frame_finished(
+            pause_window=self.game_over or self.player_manager.is_moving,
+        )
+        self.power_save_manager.update(dt, game_over=self.game_over)
+        self.power_save_manager.throttle()
         # TODO gameover check
+
+
+class MenuScene(Scene):
+    PRELOAD_BUDGET_MS = 4.
+
+    def __init__(self, *, high_scores):
+        self.camera.position = Vector(0, 0)
+        self.background = self.root.add_child(
+            Node(
+                sprite=SPRITE_MENU_BACKGROUND,
+                z_index=Layer.background,
+            )
+        )
+        self.page = self.root.add_child(
+            Node(
+                position=Vector(0, 60),
+                sprite=SPRITE_MENU_PAGE,
+                z_index=Layer.ui,
+            )
+        )
+        self.logo = self.root.add_child(
+            Node(
+                position=Vector(0, -200),
+                sprite=SPRITE_LOGO,
+                z_index=layer_z(Layer.ui, 1),
+            )
+        )
+        self.prompt = self.root.add_child(
+            TextNode(
+                position=Vector(0, 250),
+                font=FONT_PIXELED,
+                font_size=36.,
+                text="Loading...",
+                z_index=layer_z(Layer.ui, 1),
+            )
+        )
+        # built a slice at a time in update(), so that starting is immediate
+        self.gameplay_scene = GameplayScene(
+            high_scores=high_scores, preload=True,
+        )
+        self.preload_frames_count = 0
+        self.max_preload_step_ms = 0.
+        self.max_preload_frame_ms = 0.
+
+    def update(self, dt):
+        if not self.gameplay_scene.is_constructed:
+            self.preload()
+
+        for event in self.input.events():
+            if event.keyboard_key and event.keyboard_key.is_key_down:
+                self.gameplay_scene.finish_construction()
+                get_engine().change_scene(self.gameplay_scene)
+                break
+
+    def preload(self):
+        started_at = time.perf_counter()
+        deadline = started_at + self.PRELOAD_BUDGET_MS / 1000.
+        steps_count = 0
+        while True:
+            step_started_at = time.perf_counter()
+            # don't start a step unless the slowest one so far still fits,
+            # one step per frame is always made so that loading progresses
+            if (
+                steps_count
+                and step_started_at + self.max_preload_step_ms / 1000.
+                > deadline
+            ):
+                break
+            is_constructed = self.gameplay_scene.construct_step()
+            steps_count += 1
+            self.max_preload_step_ms = max(
+                self.max_preload_step_ms,
+                (time.perf_counter() - step_started_at) * 1000.,
+            )
+            if is_constructed:
+                break
+        self.preload_frames_count += 1
+        self.max_preload_frame_ms = max(
+            self.max_preload_frame_ms,
+            (time.perf_counter() - started_at) * 1000.,
+        )
+        if self.gameplay_scene.is_constructed:
+            self.prompt.text = "Press any key to start"
+            print(
+                "Gameplay preloaded in {} frames, "
+                "slowest frame {:.2f} ms, slowest step {:.2f} ms".format(
+                    self.preload_frames_count, self.max_preload_frame_ms,
+                    self.max_preload_step_ms,
+                )
+            )
@@ -0,0 +1,84 @@
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .debug import count_nodes
+
+
+def current_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # not on Linux, peak RSS is the best we can get
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, KiB elsewhere
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class SoakMonitor:
+    LOG_INTERVAL_MS = 60000.
+    COLUMNS = [
+        'elapsed_s', 'frames', 'avg_frame_ms', 'max_frame_ms',
+        'max_gc_pause_ms', 'max_particles_ms', 'particles', 'live_nodes',
+        'pending_timers', 'rss_mb', 'speed_mod', 'score', 'rescues',
+    ]
+
+    def __init__(self, log_path: Path):
+        self.log_path = log_path
+        self.started_at = time.monotonic()
+        self.rescues_count = 0
+        self._reset_interval()
+        with open(self.log_path, 'w') as log_file:
+            log_file.write(','.join(self.COLUMNS) + '\n')
+
+    def _reset_interval(self):
+        self.interval_ms = 0.
+        self.frames_count = 0
+        self.max_frame_ms = 0.
+        self.max_gc_pause_ms = 0.
+        self.max_particles_ms = 0.
+
+    def update(self, dt: int, scene):
+        self.interval_ms += dt
+        self.frames_count += 1
+        self.max_frame_ms = max(self.max_frame_ms, dt)
+        self.max_gc_pause_ms = max(
+            self.max_gc_pause_ms, scene.gc_scheduler.last_frame_pause_ms,
+        )
+        self.max_particles_ms = max(
+            self.max_particles_ms, scene.effects_manager.particles_frame_ms,
+        )
+        if self.interval_ms >= self.LOG_INTERVAL_MS:
+            self.log(scene)
+            self._reset_interval()
+
+    def log(self, scene):
+        row = [
+            '{:.0f}'.format(time.monotonic() - self.started_at),
+            str(self.frames_count),
+            '{:.2f}'.format(self.interval_ms / max(self.frames_count, 1)),
+            '{:.2f}'.format(self.max_frame_ms),
+            '{:.2f}'.format(self.max_gc_pause_ms),
+            '{:.2f}'.format(self.max_particles_ms),
+            str(scene.effects_manager.particles_count),
+            str(sum(count_nodes(scene.root).values())),
+            str(scene.timers.pending_count),
+            '{:.1f}'.format(current_rss_bytes() / 2 ** 20),
+            '{:.1f}'.format(scene.runners_manager.speed_mod),
+            str(scene.player_state.score),
+            str(self.rescues_count),
+        ]
+        with open(self.log_path, 'a') as log_file:
+            log_file.write(','.join(row) + '\n')
+        print("Soak: " + ", ".join(
+            "{}={}".format(column, value)
+            for column, value in zip(self.COLUMNS, row)
+        ))
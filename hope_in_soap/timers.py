@@ -0,0 +1,100 @@
+import math
+
+
+class _Timer:
+    __slots__ = ('name', 'callback', 'interval_ticks', 'expire_tick', 'cancelled')
+
+    def __init__(self, name, callback, interval_ticks, expire_tick):
+        self.name = name
+        self.callback = callback
+        self.interval_ticks = interval_ticks
+        self.expire_tick = expire_tick
+        self.cancelled = False
+
+
+class TimerWheel:
+    # Hashed timer wheel: a timer is put into the slot of the tick it expires
+    # on, so every tick only needs to look at a single slot. Timers further
+    # away than SLOTS_COUNT ticks simply stay in their slot for more rounds.
+    RESOLUTION_MS = 10.
+    SLOTS_COUNT = 256
+
+    def __init__(self):
+        self.slots = [[] for _ in range(self.SLOTS_COUNT)]
+        self.timers = {}
+        self.current_tick = 0
+        self.accumulated_ms = 0.
+        self.time_scale = 1.
+        self.pause_reasons = set()
+        self.fired_count = 0
+
+    @property
+    def is_paused(self) -> bool:
+        return bool(self.pause_reasons)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.timers)
+
+    def pause(self, reason: str):
+        self.pause_reasons.add(reason)
+
+    def resume(self, reason: str):
+        self.pause_reasons.discard(reason)
+
+    def schedule(self, name: str, delay_ms: float, callback, *, repeat=False):
+        self.cancel(name)
+        ticks = max(math.ceil(delay_ms / self.RESOLUTION_MS), 1)
+        timer = _Timer(name, callback, ticks if repeat else 0,
+                       self.current_tick + ticks)
+        self.timers[name] = timer
+        self._insert(timer)
+
+    def cancel(self, name: str):
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            # removed from its slot lazily, when the slot is processed
+            timer.cancelled = True
+
+    def is_scheduled(self, name: str) -> bool:
+        return name in self.timers
+
+    def tick(self, dt: float):
+        if self.is_paused:
+            return
+        self.accumulated_ms += dt * self.time_scale
+        while self.accumulated_ms >= self.RESOLUTION_MS:
+            self.accumulated_ms -= self.RESOLUTION_MS
+            self.current_tick += 1
+            self._process_slot()
+
+    def _insert(self, timer: _Timer):
+        self.slots[timer.expire_tick % self.SLOTS_COUNT].append(timer)
+
+    def _process_slot(self):
+        slot_index = self.current_tick % self.SLOTS_COUNT
+        slot = self.slots[slot_index]
+        if not slot:
+            return
+        due = []
+        remaining = []
+        for timer in slot:
+            if timer.cancelled:
+                continue
+            if timer.expire_tick == self.current_tick:
+                due.append(timer)
+            else:
+                remaining.append(timer)
+        self.slots[slot_index] = remaining
+
+        for timer in due:
+            # callback of an earlier timer in the batch may have cancelled it
+            if timer.cancelled:
+                continue
+            if timer.interval_ticks:
+                timer.expire_tick += timer.interval_ticks
+                self._insert(timer)
+            else:
+                del self.timers[timer.name]
+            self.fired_count += 1
+            timer.callback()
@@ -0,0 +1,361 @@
+import enum
+
+import numpy as np
+
+from .lanes import LANE_X_POSITIONS, LANE_HERO_Y, LANE_ENEMY_Y
+
+
+# Mirrors of the gameplay numbers, see RunnersManager, PlayerManager,
+# PowerupsManager, PlayerState and the hitboxes in nodes/scenes.
+LANES_X = np.array(LANE_X_POSITIONS, dtype=np.float32)
+LANES_COUNT = len(LANES_X)
+SOAP_Y = LANE_HERO_Y
+# Polygon.from_box(Vector(138, 330)) on a node scaled by 0.7
+SOAP_HALF_WIDTH = 138 * 0.7 / 2
+SOAP_HALF_HEIGHT = 330 * 0.7 / 2
+RUNNER_SPAWN_Y = LANE_ENEMY_Y
+RUNNER_RADIUS = 48.
+BORDER_Y = 350.
+LANE_MOVE_DURATION = 150.
+FROZEN_DURATION = 800.
+SPAWN_INTERVAL = 200.
+SPEED_MOD_INTERVAL = 300.
+SPEED_MOD_STEP = 1.5
+SLOWDOWN_DURATION = 5000.
+SLOWDOWN_FRACTION = 0.65
+
+SOAP_METER_MAX = 50000
+PEOPLE_INITIAL = 300
+PEOPLE_MAX = 10000
+POWERUP_MAX = 3
+
+
+class Action(enum.IntEnum):
+    noop = 0
+    move_left = 1
+    move_right = 2
+    use_liquid_soap = 3
+    use_antivirus = 4
+
+
+class RunnerType(enum.IntEnum):
+    virus = 0
+    oil = 1
+    mini_soap = 2
+    liquid_soap = 3
+    antivirus = 4
+
+
+# plain ints, enum attribute lookups are slow in the hot paths
+VIRUS = int(RunnerType.virus)
+OIL = int(RunnerType.oil)
+MINI_SOAP = int(RunnerType.mini_soap)
+LIQUID_SOAP = int(RunnerType.liquid_soap)
+ANTIVIRUS = int(RunnerType.antivirus)
+
+# upper bounds of random.random() for each pickup type in spawn_runner
+PICKUP_THRESHOLDS = [
+    (0.1, RunnerType.oil),
+    (0.25, RunnerType.mini_soap),
+    (0.30, RunnerType.liquid_soap),
+    (0.35, RunnerType.antivirus),
+]
+
+
+class BatchedEnv:
+    # Runs `envs_count` independent games in lockstep, one frame of `dt` ms
+    # per step(). Runners are kept in fixed size slots per game. Actions are
+    # key taps, so moving to a farther lane takes one tap per lane, after
+    # the previous move has finished. Finished games are reset right away,
+    # the observation returned for them is the first one of the next game.
+    RUNNER_SLOTS = 16
+    RUNNER_FEATURES = 5
+    PLAYER_FEATURES = 9
+
+    def __init__(self, envs_count: int, *, dt: float = 1000. / 60.,
+                 seed=None):
+        assert 0 < dt <= SPAWN_INTERVAL
+        self.envs_count = envs_count
+        self.dt = dt
+        self.rng = np.random.default_rng(seed)
+
+        shape = (envs_count, self.RUNNER_SLOTS)
+        self.runner_alive = np.zeros(shape, dtype=bool)
+        self.runner_lane = np.zeros(shape, dtype=np.int8)
+        # LANES_X[runner_lane], kept so that it's not gathered every frame
+        self.runner_x = np.zeros(shape, dtype=np.float32)
+        self.runner_y = np.zeros(shape, dtype=np.float32)
+        self.runner_velocity = np.zeros(shape, dtype=np.float32)
+        self.runner_type = np.zeros(shape, dtype=np.int8)
+
+        self.soap_lane = np.zeros(envs_count, dtype=np.int64)
+        self.soap_x = np.zeros(envs_count, dtype=np.float32)
+        self.move_from_x = np.zeros(envs_count, dtype=np.float32)
+        self.move_timer = np.zeros(envs_count, dtype=np.float32)
+        self.frozen_timer = np.zeros(envs_count, dtype=np.float32)
+
+        self.soap_meter = np.zeros(envs_count, dtype=np.float64)
+        self.people = np.zeros(envs_count, dtype=np.int64)
+        self.score = np.zeros(envs_count, dtype=np.int64)
+        self.liquid_soap_powerups = np.zeros(envs_count, dtype=np.int64)
+        self.antivirus_powerups = np.zeros(envs_count, dtype=np.int64)
+
+        self.speed_mod = np.zeros(envs_count, dtype=np.float32)
+        self.slowdown_power = np.zeros(envs_count, dtype=np.int64)
+        self.slowdown_timer = np.zeros(envs_count, dtype=np.float32)
+        self.spawn_timer = np.zeros(envs_count, dtype=np.float32)
+        self.speed_mod_timer = np.zeros(envs_count, dtype=np.float32)
+        self.dropped_spawns_count = 0
+
+        # scratch buffers, to avoid allocating temporaries every frame
+        self._runner_scratch = np.empty(shape, dtype=np.float32)
+        self._features_scratch = np.empty(
+            (self.RUNNER_FEATURES, envs_count, self.RUNNER_SLOTS),
+            dtype=np.float32,
+        )
+
+        self.reset()
+
+    @property
+    def observation_size(self) -> int:
+        return self.RUNNER_SLOTS * self.RUNNER_FEATURES + self.PLAYER_FEATURES
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.envs_count, dtype=bool)
+        self._reset(mask)
+        return self.observe()
+
+    def _reset(self, mask):
+        self.runner_alive[mask] = False
+        self.soap_lane[mask] = 2
+        self.soap_x[mask] = LANES_X[2]
+        self.move_timer[mask] = 0.
+        self.frozen_timer[mask] = 0.
+        self.soap_meter[mask] = SOAP_METER_MAX
+        self.people[mask] = PEOPLE_INITIAL
+        self.score[mask] = 0
+        self.liquid_soap_powerups[mask] = 0
+        self.antivirus_powerups[mask] = 0
+        self.speed_mod[mask] = 0.
+        self.slowdown_power[mask] = 0
+        self.slowdown_timer[mask] = 0.
+        self.spawn_timer[mask] = 0.
+        self.speed_mod_timer[mask] = 0.
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        dt = self.dt
+        score_before = self.score.copy()
+
+        self._apply_actions(actions)
+        self._update_timers(dt)
+        self._update_movement(dt)
+
+        moved = self._runner_scratch
+        np.multiply(self.runner_velocity, np.float32(dt / 1000.), out=moved)
+        moved *= self.runner_alive
+        self.runner_y += moved
+        self._handle_collisions()
+
+        np.subtract(self.soap_meter, dt * 2, out=self.soap_meter)
+        np.maximum(self.soap_meter, 0, out=self.soap_meter)
+
+        rewards = (self.score - score_before).astype(np.float32)
+        dones = (self.people == 0) | (self.soap_meter == 0)
+        if dones.any():
+            self._reset(dones)
+        return self.observe(), rewards, dones
+
+    def observe(self):
+        # runner features are laid out feature-major: all slots' alive flags,
+        # then all slots' lanes and so on, followed by player features
+        slots = self.RUNNER_SLOTS
+        observations = np.empty(
+            (self.envs_count, self.observation_size), dtype=np.float32,
+        )
+        # features are computed in contiguous buffers and copied in at once,
+        # ufuncs over 16 wide column blocks of observations are a lot slower
+        alive, lane, y, velocity, runner_type = features = self._features_scratch
+        alive[:] = self.runner_alive
+        np.multiply(self.runner_lane, alive, out=lane)
+        np.subtract(self.runner_y, SOAP_Y, out=y)
+        y *= alive
+        y *= np.float32(1. / 1000.)
+        np.multiply(self.runner_velocity, alive, out=velocity)
+        velocity *= np.float32(1. / 1000.)
+        np.multiply(self.runner_type, alive, out=runner_type)
+        observations[:, :self.RUNNER_FEATURES * slots].reshape(
+            self.envs_count, self.RUNNER_FEATURES, slots,
+        )[:] = features.transpose(1, 0, 2)
+
+        player = observations[:, self.RUNNER_FEATURES * slots:]
+        player[:, 0] = self.soap_lane
+        player[:, 1] = self.soap_x / 1000.
+        player[:, 2] = self.move_timer > 0.
+        player[:, 3] = self.frozen_timer > 0.
+        player[:, 4] = self.soap_meter / SOAP_METER_MAX
+        player[:, 5] = self.people / PEOPLE_INITIAL
+        player[:, 6] = self.liquid_soap_powerups
+        player[:, 7] = self.antivirus_powerups
+        player[:, 8] = self.speed_mod / 1000.
+        return observations
+
+    def _apply_actions(self, actions):
+        can_move = (self.move_timer <= 0.) & (self.frozen_timer <= 0.)
+        direction = (
+            (actions == Action.move_right).astype(np.int64)
+            - (actions == Action.move_left)
+        )
+        target_lane = self.soap_lane + direction
+        moving = (
+            can_move & (direction != 0)
+            & (target_lane >= 0) & (target_lane < LANES_COUNT)
+        )
+        self.move_from_x[moving] = self.soap_x[moving]
+        self.soap_lane[moving] = target_lane[moving]
+        self.move_timer[moving] = LANE_MOVE_DURATION
+
+        slowdown = (
+            (actions == Action.use_liquid_soap)
+            & (self.liquid_soap_powerups > 0)
+        )
+        if slowdown.any():
+            self.liquid_soap_powerups[slowdown] -= 1
+            self.slowdown_power[slowdown] += 1
+            self.slowdown_timer[slowdown] = SLOWDOWN_DURATION
+            slowed = (
+                slowdown[:, None] & self.runner_alive
+                & (self.runner_type == VIRUS)
+            )
+            self.runner_velocity[slowed] *= SLOWDOWN_FRACTION
+
+        nuke = (
+            (actions == Action.use_antivirus)
+            & (self.antivirus_powerups > 0)
+        )
+        if nuke.any():
+            self.antivirus_powerups[nuke] -= 1
+            self.runner_alive[
+                nuke[:, None] & (self.runner_type == VIRUS)
+            ] = False
+
+    def _update_timers(self, dt):
+        self.speed_mod_timer += dt
+        due = self.speed_mod_timer >= SPEED_MOD_INTERVAL
+        self.speed_mod_timer[due] -= SPEED_MOD_INTERVAL
+        self.speed_mod[due] += SPEED_MOD_STEP
+
+        expiring = self.slowdown_timer > 0.
+        self.slowdown_timer[expiring] -= dt
+        self.slowdown_power[expiring & (self.slowdown_timer <= 0.)] = 0
+
+        self.frozen_timer[self.frozen_timer > 0.] -= dt
+
+        self.spawn_timer += dt
+        due = self.spawn_timer >= SPAWN_INTERVAL
+        self.spawn_timer[due] -= SPAWN_INTERVAL
+        self._spawn_runners(np.flatnonzero(due))
+
+    def _spawn_runners(self, envs):
+        if not envs.size:
+            return
+        speed_mod = self.speed_mod[envs]
+        spawning = (
+            self.rng.random(envs.size)
+            > np.maximum(0.80 - speed_mod / 1000., 0.5)
+        )
+        free_slot = np.argmin(self.runner_alive[envs], axis=1)
+        # no free slot left, the spawn is dropped
+        full = self.runner_alive[envs, free_slot]
+        self.dropped_spawns_count += int(np.count_nonzero(spawning & full))
+        spawning &= ~full
+        envs, free_slot, speed_mod = (
+            envs[spawning], free_slot[spawning], speed_mod[spawning]
+        )
+        if not envs.size:
+            return
+
+        kind_roll = self.rng.random(envs.size)
+        runner_type = np.full(envs.size, VIRUS, dtype=np.int8)
+        for threshold, pickup_type in reversed(PICKUP_THRESHOLDS):
+            runner_type[kind_roll < threshold] = pickup_type
+
+        self.runner_alive[envs, free_slot] = True
+        self.runner_type[envs, free_slot] = runner_type
+        runner_lane = self.rng.integers(0, LANES_COUNT, envs.size)
+        self.runner_lane[envs, free_slot] = runner_lane
+        self.runner_x[envs, free_slot] = LANES_X[runner_lane]
+        self.runner_y[envs, free_slot] = RUNNER_SPAWN_Y
+        # as in the game, slowdown power does not affect new runners' speed
+        self.runner_velocity[envs, free_slot] = self.rng.uniform(
+            300., 300. + speed_mod,
+        )
+
+    def _update_movement(self, dt):
+        moving = self.move_timer > 0.
+        self.move_timer[moving] -= dt
+        np.maximum(self.move_timer, 0., out=self.move_timer)
+        progress = 1. - self.move_timer / LANE_MOVE_DURATION
+        target_x = LANES_X[self.soap_lane]
+        self.soap_x[moving] = (
+            self.move_from_x + (target_x - self.move_from_x) * progress
+        )[moving]
+
+    def _handle_collisions(self):
+        alive = self.runner_alive
+        # distance from the soap box to runner centers, in place where possible
+        dx = np.subtract(self.runner_x, self.soap_x[:, None])
+        np.abs(dx, out=dx)
+        dx -= np.float32(SOAP_HALF_WIDTH)
+        np.maximum(dx, 0., out=dx)
+        dx *= dx
+        dy = np.subtract(self.runner_y, np.float32(SOAP_Y))
+        np.abs(dy, out=dy)
+        dy -= np.float32(SOAP_HALF_HEIGHT)
+        np.maximum(dy, 0., out=dy)
+        dy *= dy
+        dx += dy
+        caught = dx < np.float32(RUNNER_RADIUS * RUNNER_RADIUS)
+        caught &= alive
+        missed = self.runner_y >= np.float32(BORDER_Y - RUNNER_RADIUS)
+        missed &= alive
+        missed &= ~caught
+        hit = caught | missed
+        # only a few games have any collision in a given frame
+        envs = np.flatnonzero(hit.any(axis=1))
+        if not envs.size:
+            return
+        alive[envs] &= ~hit[envs]
+        caught = caught[envs]
+        missed = missed[envs]
+        runner_type = self.runner_type[envs]
+
+        def caught_count(kind):
+            return np.count_nonzero(caught & (runner_type == kind), axis=1)
+
+        viruses = runner_type == VIRUS
+        killed = np.count_nonzero(caught & viruses, axis=1)
+        self.score[envs] += killed * 10
+        self.people[envs] = np.clip(
+            self.people[envs] + killed
+            - np.count_nonzero(missed & viruses, axis=1) * 50,
+            0, PEOPLE_MAX,
+        )
+        self.soap_meter[envs] = np.minimum(
+            self.soap_meter[envs] + caught_count(MINI_SOAP) * 10000,
+            SOAP_METER_MAX,
+        )
+        self.liquid_soap_powerups[envs] = np.minimum(
+            self.liquid_soap_powerups[envs]
+            + caught_count(LIQUID_SOAP),
+            POWERUP_MAX,
+        )
+        self.antivirus_powerups[envs] = np.minimum(
+            self.antivirus_powerups[envs] + caught_count(ANTIVIRUS),
+            POWERUP_MAX,
+        )
+        frozen = envs[
+            (caught_count(OIL) > 0) & (self.frozen_timer[envs] <= 0.)
+        ]
+        self.frozen_timer[frozen] = FROZEN_DURATION
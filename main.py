@@ -1,4 +1,6 @@
 import sys
+import argparse
+from pathlib import Path
 
 from kaa.engine import Engine
 from kaa.geometry import Vector
@@ -6,9 +8,33 @@ from kaa.geometry import Vector
 
 sys.path.append('')
 
-from hope_in_soap.scenes import GameplayScene 
+from hope_in_soap.constants import HIGH_SCORES_DIRECTORY
+from hope_in_soap.highscores import HighScoresStore, NullHighScoresStore
+from hope_in_soap.scenes import MenuScene, GameplayScene
+from hope_in_soap.soak import SoakMonitor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--autopilot', action='store_true',
+        help="let the bot play, skipping the menu",
+    )
+    parser.add_argument(
+        '--soak', type=Path, metavar='LOG_PATH',
+        help="run with autopilot indefinitely, logging stats every minute",
+    )
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
+    args = parse_args()
     with Engine(virtual_resolution=Vector(1280, 720)) as engine:
-        engine.run(GameplayScene())
+        if args.autopilot or args.soak:
+            engine.run(GameplayScene(
+                high_scores=NullHighScoresStore(), autopilot=True,
+                soak_monitor=SoakMonitor(args.soak) if args.soak else None,
+            ))
+        else:
+            high_scores = HighScoresStore(HIGH_SCORES_DIRECTORY)
+            engine.run(MenuScene(high_scores=high_scores))